@@ -0,0 +1,308 @@
+"""
+Общая логика парсеров голосов: разбор дат, сканирование выгрузок
+ВКонтакте (.md) и Telegram (текст) и сводные таблицы.
+Скрипты parser-vk.py и parser-tg.py — тонкие CLI-обёртки над этим модулем.
+"""
+import re
+import bisect
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# все форматы дат в одном альтернированном шаблоне:
+# строка проверяется одним проходом движка вместо цепочки re.match
+_DATE_RE = re.compile(
+    r"(?P<full>(?P<f_d>\d{2})\.(?P<f_mo>\d{2})\.(?P<f_y>\d{4})\s+(?P<f_h>\d{1,2}):(?P<f_mi>\d{2}))"
+    r"|(?P<minago>(?P<mins>\d+)\s+минут)"
+    r"|(?P<hourago>(?P<hours>\d+)\s+час)"
+    r"|(?P<today>сегодня в (?P<t_h>\d{1,2}):(?P<t_m>\d{2}))"
+    r"|(?P<yest>вчера в (?P<y_h>\d{1,2}):(?P<y_m>\d{2}))"
+    r"|(?P<md>(?P<d_day>\d{1,2})\s+(?P<d_mon>янв|фев|мар|апр|май|июн|июл|авг|сен|окт|ноя|дек)"
+    r" в (?P<d_h>\d{1,2}):(?P<d_m>\d{2}))"
+)
+
+# текстовые варианты часов: 'час назад', 'два часа назад', 'три часа назад'
+_TEXTUAL_MAP = {'час назад': 1, 'два часа назад': 2, 'три часа назад': 3}
+_MON_MAP = {
+    'янв': 1, 'фев': 2, 'мар': 3, 'апр': 4, 'май': 5, 'июн': 6,
+    'июл': 7, 'авг': 8, 'сен': 9, 'окт': 10, 'ноя': 11, 'дек': 12
+}
+
+# байтовые шаблоны для сканирования .md ВКонтакте без декодирования всего файла
+_VK_USER_LINK_RE = re.compile(rb"\[([^\]]+)\]\(https://vk\.com/[^)]+\)")
+_VK_NUMBER_RE = re.compile(rb"([1-9][0-9]?)")
+_VK_DATE_LINK_RE = re.compile(rb"\[([^]]+)\]\(")
+_VK_SHOW_VOTES_MARKER = 'Показать список оценивших'.encode('utf-8')
+
+# шаблоны заголовков выгрузки Telegram
+_TG_HEADER_RE = re.compile(r"^(.+), \[(\d{2}\.\d{2}\.\d{4} \d{1,2}:\d{2})\]$")
+_TG_NUMBER_RE = re.compile(r"([1-9][0-9]?)")
+
+
+# заранее отформатированные двузначные числа: индексация списка и f-строка
+# дешевле разбора строки формата внутри strftime на каждый вызов
+_D2 = [f"{i:02d}" for i in range(60)]
+
+
+def _fmt(dt: datetime) -> str:
+    """Форматирует datetime в 'DD.MM.YYYY HH:MM' без strftime."""
+    return f"{_D2[dt.day]}.{_D2[dt.month]}.{dt.year} {_D2[dt.hour]}:{_D2[dt.minute]}"
+
+
+def _parse_full_date(raw_l: str):
+    """
+    Посимвольный разбор 'DD.MM.YYYY HH:MM' срезами, без движка re.
+    Возвращает datetime или None, если строка не этого формата
+    (тогда разбор уходит на общий путь через _DATE_RE).
+    """
+    if len(raw_l) < 14 or raw_l[2] != '.' or raw_l[5] != '.' or raw_l[10] != ' ':
+        return None
+    c = raw_l.find(':', 11)
+    if c < 12 or c > 13:
+        return None
+    day, mon, year = raw_l[0:2], raw_l[3:5], raw_l[6:10]
+    hour, minute = raw_l[11:c], raw_l[c + 1:c + 3]
+    if not (day.isdigit() and mon.isdigit() and year.isdigit()
+            and hour.isdigit() and len(minute) == 2 and minute.isdigit()):
+        return None
+    return datetime(int(year), int(mon), int(day), int(hour), int(minute))
+
+
+def parse_date(raw: str, now: datetime = None) -> str:
+    """
+    Преобразует различные форматы дат в единый формат 'DD.MM.YYYY HH:MM'.
+    Поддерживает:
+        - полные даты 'DD.MM.YYYY HH:MM'
+        - 'X минут(а/ы) назад'
+        - 'час назад', 'два часа назад', 'три часа назад'
+        - 'X часов назад'
+        - 'сегодня в HH:MM'
+        - 'вчера в HH:MM'
+        - 'DD мес. в HH:MM'
+    Если не удалось распознать, возвращает исходную строку.
+    """
+    if not raw:
+        return ''
+    if now is None:
+        now = datetime.now()
+    raw_l = raw.lower().strip()
+
+    # текстовые варианты часов — дешёвая проверка по словарю до регулярки
+    if raw_l in _TEXTUAL_MAP:
+        return _fmt(now - timedelta(hours=_TEXTUAL_MAP[raw_l]))
+
+    # 'сегодня в HH:MM' / 'вчера в HH:MM' — проверка префикса и partition
+    # на порядок дешевле запуска движка регулярных выражений
+    if raw_l.startswith('сегодня в '):
+        hh, sep, mm = raw_l[10:].partition(':')
+        if sep and hh.isdigit() and len(hh) <= 2 and mm[:2].isdigit() and len(mm) >= 2:
+            return f"{_D2[now.day]}.{_D2[now.month]}.{now.year} {_D2[int(hh)]}:{mm[:2]}"
+    elif raw_l.startswith('вчера в '):
+        hh, sep, mm = raw_l[8:].partition(':')
+        if sep and hh.isdigit() and len(hh) <= 2 and mm[:2].isdigit() and len(mm) >= 2:
+            yd = now - timedelta(days=1)
+            return f"{_D2[yd.day]}.{_D2[yd.month]}.{yd.year} {_D2[int(hh)]}:{mm[:2]}"
+
+    # самый частый формат — полная дата; пробуем дешёвый разбор срезами
+    dt = _parse_full_date(raw_l)
+    if dt is not None:
+        return _fmt(dt)
+
+    m = _DATE_RE.match(raw_l)
+    if m is None:
+        # fallback: возвращаем исходную строку
+        return raw
+    if m.group('full'):
+        dt = datetime(int(m.group('f_y')), int(m.group('f_mo')), int(m.group('f_d')),
+                      int(m.group('f_h')), int(m.group('f_mi')))
+    elif m.group('minago'):
+        dt = now - timedelta(minutes=int(m.group('mins')))
+    elif m.group('hourago'):
+        dt = now - timedelta(hours=int(m.group('hours')))
+    elif m.group('today'):
+        # дата уже известна — собираем строку без промежуточного now.replace()
+        return f"{_D2[now.day]}.{_D2[now.month]}.{now.year} {_D2[int(m.group('t_h'))]}:{m.group('t_m')}"
+    elif m.group('yest'):
+        yd = now - timedelta(days=1)
+        return f"{_D2[yd.day]}.{_D2[yd.month]}.{yd.year} {_D2[int(m.group('y_h'))]}:{m.group('y_m')}"
+    else:  # DD мес. в HH:MM
+        dt = datetime(now.year, _MON_MAP[m.group('d_mon')], int(m.group('d_day')),
+                      int(m.group('d_h')), int(m.group('d_m')))
+    return _fmt(dt)
+
+
+def _scan_vk(md_file: str) -> tuple:
+    """Сканирует .md выгрузку ВКонтакте, возвращает (имена, номера, даты)."""
+    usernames = []
+    participants = []
+    dates = []
+    # читаем файл байтовыми строками: декодируем только захваченные группы,
+    # а не весь файл; strip делаем лениво — лишь для строк, из которых
+    # реально что-то извлекается
+    with open(md_file, 'rb') as f:
+        lines = f.read().split(b'\n')
+
+    # размечаем пропускаемые строки (пустые, картинки, пустые ссылки) одним
+    # проходом; дальше прыгаем по разметке через C-уровневый find вместо
+    # повторных startswith-проверок на каждую строку-кандидата
+    skip = bytearray(len(lines))
+    marker_positions = []  # отсортированы по построению
+    for n, l in enumerate(lines):
+        if not l or l.isspace() or l.startswith(b'![') or l.startswith(b'[]('):
+            skip[n] = 1
+        if _VK_SHOW_VOTES_MARKER in l:
+            marker_positions.append(n)
+
+    i = 0
+    while i < len(lines):
+        user_match = _VK_USER_LINK_RE.search(lines[i])
+        if user_match:
+            username = user_match.group(1).decode('utf-8')
+            # ищем комментарий — первую непропускаемую строку ниже
+            j = skip.find(0, i + 1)
+            if j == -1:
+                i += 1
+                continue
+            comment = lines[j].strip()
+            num_match = _VK_NUMBER_RE.search(comment)
+            if not num_match:
+                i = j + 1
+                continue
+            participant = int(num_match.group(1))
+            # ищем дату: ближайший маркер ниже комментария за O(log M)
+            # вместо линейного прохода по хвосту файла для каждого голоса
+            raw_date = ''
+            k = bisect.bisect_left(marker_positions, j + 1)
+            if k < len(marker_positions):
+                idx = marker_positions[k] + 2
+                if idx < len(lines):
+                    m = _VK_DATE_LINK_RE.match(lines[idx].strip())
+                    if m:
+                        raw_date = m.group(1).decode('utf-8')
+            usernames.append(username)
+            participants.append(participant)
+            dates.append(raw_date)
+            i = j + 1
+        else:
+            i += 1
+
+    return usernames, participants, dates
+
+
+def _scan_tg(md_file: str) -> tuple:
+    """
+    Сканирует текстовую выгрузку Telegram с блоками:
+      Имя, [дата]
+      комментарий
+    Возвращает (имена, номера, даты).
+    """
+    usernames = []
+    participants = []
+    dates = []
+    # файл читаем потоково: заголовок запоминаем и ждём следующую строку
+    # с комментарием, не материализуя всю выгрузку списком строк
+    with open(md_file, 'r', encoding='utf-8') as f:
+        pending = None  # (имя, дата) из заголовка, ожидающего комментарий
+        for raw in f:
+            line = raw.strip()
+            if pending is not None:
+                num_match = _TG_NUMBER_RE.search(line)
+                if num_match:
+                    usernames.append(pending[0])
+                    participants.append(int(num_match.group(1)))
+                    dates.append(pending[1])
+                pending = None
+                continue
+            m = _TG_HEADER_RE.match(line)
+            if m:
+                pending = (m.group(1), m.group(2))
+
+    return usernames, participants, dates
+
+
+_SCANNERS = {'vk': _scan_vk, 'tg': _scan_tg}
+
+
+def parse_votes(md_file: str, source: str = 'vk') -> pd.DataFrame:
+    """Разбирает выгрузку указанного источника ('vk' или 'tg') в DataFrame."""
+    try:
+        scan = _SCANNERS[source]
+    except KeyError:
+        raise ValueError(f"Неизвестный источник выгрузки: {source!r}")
+    usernames, participants, dates = scan(md_file)
+
+    # колонки собираем параллельными списками, а не списком словарей:
+    # pandas принимает каждый список целиком, без пересборки ключей по строкам
+    df = pd.DataFrame({'Имя пользователя': usernames,
+                       'Номер участника': participants,
+                       'Дата голосования': dates})
+    # номера участников ограничены 1..99, имена многократно повторяются:
+    # int8 и category заметно дешевле int64 и object в сводках
+    df['Номер участника'] = df['Номер участника'].astype('int8')
+    df['Имя пользователя'] = df['Имя пользователя'].astype('category')
+    # строки, уже несущие полную дату 'DD.MM.YYYY HH:MM' (заголовки Telegram),
+    # берём как есть; через parse_date гоняем только остальные — и только
+    # уникальные, потому что в выгрузках много повторов
+    normalized = df['Дата голосования'].str.match(r"\d{2}\.\d{2}\.\d{4} \d{2}:\d{2}$")
+    uniq = pd.unique(df.loc[~normalized, 'Дата голосования'])
+    now = datetime.now()  # одна точка отсчёта для всех относительных дат файла
+    cache = {s: parse_date(s, now) for s in uniq}
+    df['Дата и время (Excel)'] = df['Дата голосования'].where(
+        normalized, df['Дата голосования'].map(cache))
+    # добавляем отдельный столбец с датой для Excel
+    df['Дата'] = df['Дата и время (Excel)'].str.split(' ', n=1).str[0]
+    return df
+
+
+def summarize(df: pd.DataFrame) -> tuple:
+    """
+    Строит сводные таблицы №1 и №3 за один вызов:
+    одна группировка по номеру участника вместо двух независимых value_counts.
+    Для уникальных голосов учитывается только первый голос каждого пользователя.
+    """
+    grouped = df.groupby('Номер участника', observed=True, sort=True)
+    table_all = grouped.size().rename_axis('Номер участника').reset_index(name='Количество голосов')
+    # первый голос каждого пользователя одной хеш-группировкой,
+    # без материализации дедуплицированного среза DataFrame
+    table_unique = (df.groupby('Имя пользователя', observed=True)['Номер участника']
+                    .first()
+                    .value_counts()
+                    .sort_index()
+                    .rename_axis('Номер участника')
+                    .reset_index(name='Уникальные голоса'))
+    return table_all, table_unique
+
+
+def summarize_polars(df: pd.DataFrame) -> tuple:
+    """
+    Вариант summarize() на polars (Rust, SIMD, колоночный Arrow) — быстрее
+    pandas на больших выгрузках. polars — необязательная зависимость,
+    поэтому импортируется только здесь; результат отдаём как pandas,
+    чтобы печать и Excel-экспорт не менялись.
+    """
+    import polars as pl
+
+    # списки/numpy вместо pandas-серий: конвертация категорий в polars
+    # потребовала бы ещё и pyarrow
+    votes = pl.DataFrame({
+        'Имя пользователя': df['Имя пользователя'].astype(str).tolist(),
+        'Номер участника': df['Номер участника'].to_numpy(),
+    })
+    table_all = (votes
+                 .group_by('Номер участника')
+                 .len(name='Количество голосов')
+                 .sort('Номер участника'))
+    table_unique = (votes
+                    .unique(subset=['Имя пользователя'], keep='first', maintain_order=True)
+                    .group_by('Номер участника')
+                    .len(name='Уникальные голоса')
+                    .sort('Номер участника'))
+    # обратно в pandas поколоночно (to_pandas() тянет pyarrow)
+    def _to_pd(tbl):
+        return pd.DataFrame({c: tbl[c].to_list() for c in tbl.columns})
+
+    return _to_pd(table_all), _to_pd(table_unique)
+
+
+def detail_by_user(df: pd.DataFrame) -> pd.DataFrame:
+    return df[['Имя пользователя', 'Номер участника', 'Дата голосования', 'Дата и время (Excel)', 'Дата']]